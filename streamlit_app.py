@@ -1,15 +1,18 @@
 # streamlit_app.py
+import os
+from typing import NamedTuple
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
 
 # -----------------------------
 # Page config & CSS
 # -----------------------------
 st.set_page_config(page_title="가축 질병 발생 대시보드", layout="wide")
-st.markdown(
-    """
+CSS_BLOCK = """
     <style>
     [data-testid="block-container"] {
         padding: 1.0rem 2.0rem;
@@ -17,39 +20,118 @@ st.markdown(
     [data-testid="stSidebar"] {
         width: 300px; min-width: 300px; padding: 0.8rem;
     }
-    .divider { margin: 0.8rem 0 1.0rem 0; }
+    [data-testid="stMarkdownContainer"] hr { margin: 0.8rem 0 1.0rem 0; }
     h2, h3 { letter-spacing: -0.5px; }
     </style>
-    """,
-    unsafe_allow_html=True,
-)
+    """
+st.markdown(CSS_BLOCK, unsafe_allow_html=True)
 
 # -----------------------------
 # Load data
 # -----------------------------
-@st.cache_data
-def load_data(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding="cp949")
-    for c in df.columns:
-        if c != "연월":
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    df["연"] = (df["연월"] // 100).astype(int)
-    df["월"] = (df["연월"] % 100).astype(int)
+NON_REGION_COLS = ("연월", "연", "월", "소계")
+
+def region_columns(columns) -> list:
+    """지역 컬럼 = 연월/연/월/소계를 제외한 나머지"""
+    return [c for c in columns if c not in NON_REGION_COLS]
+
+# 파싱 결과(컬럼 구성/dtype)가 바뀌면 올려서 이전 parquet 캐시를 무효화
+SOURCE_CACHE_VERSION = 2
+
+def read_source(path: str) -> pd.DataFrame:
+    """CSV를 파싱해 타입/파생 컬럼을 정리 (CSV보다 최신인 parquet가 있으면 재사용)"""
+    cache_path = f"{path}.v{SOURCE_CACHE_VERSION}.parquet"
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:
+            pass  # 손상된 캐시는 무시하고 CSV를 다시 파싱 (아래에서 덮어씀)
+
+    # 헤더만 먼저 읽어 컬럼별 dtype을 지정 (파싱 후 별도 변환 없음, "-" 표기는 결측)
+    header = pd.read_csv(path, encoding="cp949", nrows=0).columns
+    dtypes = {c: "float32" for c in header if c != "연월"} | {"연월": "int32"}
+    df = pd.read_csv(path, encoding="cp949", engine="pyarrow", dtype=dtypes, na_values=["-", "- "])
+    year, month = np.divmod(df["연월"].to_numpy(dtype=np.int32), 100)
+    df["연"] = year.astype(np.int16)
+    df["월"] = month.astype(np.int8)
+
+    regions = region_columns(df.columns)
+    # '소계'가 없거나 비어 있는 행은 지역합으로 보강 (NaN은 0으로 취급)
+    region_sum = np.nansum(df[regions].to_numpy(dtype=np.float64), axis=1)
+    if "소계" in df.columns:
+        df["소계"] = np.where(df["소계"].isna(), region_sum, df["소계"])
+    else:
+        df["소계"] = region_sum
+
+    # 임시 파일에 쓴 뒤 교체해야 동시에 시작한 다른 워커가 쓰다 만 파일을 읽지 않음
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # 읽기 전용 배포 환경이면 매번 CSV를 파싱
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
     return df
 
-df = load_data("가축질병발생통계.csv")
+class DashboardData(NamedTuple):
+    """load_data 결과: 화면에서 쓰는 사전 집계/조회 테이블"""
+    regions: list                     # 지역 컬럼 (CSV 순서)
+    monthly_by_region: pd.DataFrame   # (연, 월) × 지역/소계 합계, 없는 달은 0
+    ytd_cum: pd.DataFrame             # monthly_by_region의 연도별 누계
+    monthly_total: np.ndarray         # (연도 수, 12) 월별 소계
+    year_to_idx: dict                 # 연 -> monthly_total 행
+    region_matrix: np.ndarray         # (행 수, 지역 수) float32, 결측은 0
+    region_index: dict                # 지역 -> region_matrix 열
+    year_month_to_row: dict           # 연월 -> region_matrix 행
+    year_options: list                # 정렬된 연도 목록
+    years_set: frozenset              # 연도 존재 여부 조회용
+    months_per_year: dict             # 연 -> 데이터가 있는 월 집합
 
-# 지역 컬럼
-regions_all = [c for c in df.columns if c not in ["연월", "연", "월", "소계"]]
-
-def ensure_total_col(frame: pd.DataFrame) -> pd.DataFrame:
-    """'소계'가 없으면 지역합으로 보강"""
-    if "소계" not in frame.columns or frame["소계"].isna().all():
-        frame = frame.copy()
-        frame["소계"] = frame[regions_all].sum(axis=1, numeric_only=True)
-    return frame
+@st.cache_data
+def load_data(path: str) -> DashboardData:
+    df = read_source(path)
+    regions = region_columns(df.columns)
+
+    # (연, 월) 단위 집계: 모든 연도 × 1~12월, 없는 달은 0
+    years = sorted(df["연"].unique().tolist())
+    idx = pd.MultiIndex.from_product([years, range(1, 13)], names=["연", "월"])
+    monthly_by_region = (
+        df.groupby(["연", "월"])[regions + ["소계"]].sum()
+        .reindex(idx, fill_value=0)
+    )
+    # 연도별 1월부터의 누계(YTD)
+    ytd_cum = monthly_by_region.groupby(level="연").cumsum()
+    # 연도 × 월 소계 배열 (행: year_to_idx[연], 열: 1~12월)
+    monthly_total = monthly_by_region["소계"].to_numpy().reshape(len(years), 12)
+    year_to_idx = {y: i for i, y in enumerate(years)}
+
+    # 지역값 행렬(행: 연월, 열: 지역) + 조회용 인덱스, 결측은 0
+    region_matrix = np.nan_to_num(df[regions].to_numpy(dtype=np.float32))
+    region_index = {r: i for i, r in enumerate(regions)}
+    year_month_to_row = dict(zip(df["연월"].tolist(), range(len(df))))
+
+    # 사이드바 선택지: 연도 목록, 연도별 데이터가 있는 월
+    months_per_year = {y: set() for y in years}
+    for y, m in zip(df["연"].tolist(), df["월"].tolist()):
+        months_per_year[y].add(m)
+    return DashboardData(
+        regions=regions,
+        monthly_by_region=monthly_by_region,
+        ytd_cum=ytd_cum,
+        monthly_total=monthly_total,
+        year_to_idx=year_to_idx,
+        region_matrix=region_matrix,
+        region_index=region_index,
+        year_month_to_row=year_month_to_row,
+        year_options=years,
+        years_set=frozenset(years),
+        months_per_year=months_per_year,
+    )
 
-df = ensure_total_col(df)
+data = load_data("가축질병발생통계.csv")
 
 # -----------------------------
 # Palettes
@@ -72,69 +154,154 @@ PALETTES = {
     },
 }
 DEFAULT_THEME = "TealMint"
+PALETTE_NAMES = tuple(PALETTES)
+DEFAULT_THEME_INDEX = PALETTE_NAMES.index(DEFAULT_THEME)
+
+@st.cache_resource
+def get_template(name: str) -> go.layout.Template:
+    """테마별 Plotly 템플릿 (기본 템플릿 + colorway/연속 색상 + 여백), 프로세스당 한 번 생성"""
+    p = PALETTES[name]
+    tpl = go.layout.Template(pio.templates[p["template"]])
+    tpl.layout.colorway = p["seq"]
+    tpl.layout.coloraxis.colorscale = p["cont"]
+    tpl.layout.margin = dict(l=10, r=10, t=10, b=10)
+    return tpl
+
+# -----------------------------
+# Chart data (테마와 무관, 선택값 기준 캐시)
+# -----------------------------
+@st.cache_data(max_entries=256)
+def get_region_row(year: int, month: int, regions: tuple) -> np.ndarray:
+    """해당 연월의 선택 지역 값 (없는 연월은 0)"""
+    row_idx = data.year_month_to_row.get(year * 100 + month)
+    if row_idx is None:
+        return np.zeros(len(regions), dtype=np.float32)
+    return data.region_matrix[row_idx, [data.region_index[r] for r in regions]]
+
+@st.cache_data(max_entries=64)
+def get_trend(year: int):
+    # 같은 연도의 추세 (없는 달 0으로)
+    return year * 100 + np.arange(1, 13), data.monthly_total[data.year_to_idx[year]]
+
+@st.cache_data(max_entries=64)
+def get_heatmap(year: int, regions: tuple) -> np.ndarray:
+    # 행: 지역, 열: 1~12월 (누락월은 이미 0으로 집계됨)
+    return data.monthly_by_region.loc[year, list(regions)].to_numpy().T
+
+# -----------------------------
+# Figures (데이터 배열 + 테마 기준 캐시, 테마는 템플릿으로만 적용)
+# -----------------------------
+@st.cache_resource(max_entries=64)
+def build_trend_fig(trend_x: np.ndarray, trend_y: np.ndarray, theme: str):
+    fig = go.Figure(go.Scatter(
+        x=trend_x, y=trend_y, mode="lines+markers",
+        line=dict(width=3), marker=dict(size=7),
+    ))
+    fig.update_layout(
+        template=get_template(theme),
+        xaxis_title="연월",
+        yaxis_title="발생건수",
+        height=330,
+    )
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_region_bar(regions: tuple, row_vec: np.ndarray, theme: str):
+    order = np.argsort(row_vec)
+    values = row_vec[order]
+
+    fig = go.Figure(go.Bar(
+        x=values, y=[regions[i] for i in order],
+        orientation="h",
+        marker=dict(color=values, coloraxis="coloraxis"),
+    ))
+    fig.update_layout(
+        template=get_template(theme),
+        coloraxis_colorbar_title="발생건수",
+        xaxis_title="발생건수",
+        yaxis_title="지역",
+        height=340,
+    )
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_heatmap(regions: tuple, heatmap_np: np.ndarray, theme: str):
+    fig = go.Figure(go.Heatmap(
+        z=heatmap_np, x=np.arange(1, 13), y=list(regions),
+        coloraxis="coloraxis",
+    ))
+    fig.update_layout(
+        template=get_template(theme),
+        coloraxis_colorbar_title="발생건수",
+        xaxis_title="월",
+        yaxis=dict(title="지역", autorange="reversed"),
+        height=350,
+    )
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_top5(regions: tuple, row_vec: np.ndarray, theme: str):
+    # 상위 k개만 부분 정렬 후 그 k개를 내림차순 정렬
+    k = min(5, len(row_vec))
+    top_idx = np.argpartition(-row_vec, kth=k - 1)[:k]
+    top_idx = top_idx[np.argsort(-row_vec[top_idx], kind="stable")]
+    values = row_vec[top_idx]
+
+    fig = go.Figure(go.Bar(
+        x=[regions[i] for i in top_idx], y=values,
+        marker=dict(color=values, coloraxis="coloraxis"),
+    ))
+    fig.update_layout(
+        template=get_template(theme),
+        coloraxis_colorbar_title="발생건수",
+        xaxis_title="지역",
+        yaxis_title="발생건수",
+        height=340,
+    )
+    return fig
 
 # -----------------------------
 # Sidebar: Year/Month + YTD
 # -----------------------------
 st.sidebar.title("가축 질병 발생 대시보드")
 
-year_options = sorted(df["연"].unique())
-selected_year = st.sidebar.selectbox("연도 선택", year_options, index=0)
+selected_year = st.sidebar.selectbox("연도 선택", data.year_options, index=0)
 
 # 항상 1~12월을 보여주되, 없는 달은 0 처리
 month_options = list(range(1, 13))
 # 해당 연의 실제 데이터가 있는 최대 월(없으면 12로)
-year_months = df.loc[df["연"] == selected_year, "월"]
-default_month = int(year_months.max()) if not year_months.empty else 12
+year_months = data.months_per_year[selected_year]
+default_month = max(year_months) if year_months else 12
 selected_month = st.sidebar.selectbox("월 선택", month_options, index=default_month-1)
 
 # 지역 & 테마
-selected_regions = st.sidebar.multiselect("지역 선택", regions_all, default=regions_all)
-theme_name = st.sidebar.selectbox("시각화 테마 선택", list(PALETTES.keys()),
-                                  index=list(PALETTES.keys()).index(DEFAULT_THEME))
-palette = PALETTES[theme_name]
+selected_regions = st.sidebar.multiselect("지역 선택", data.regions, default=data.regions)
+theme_name = st.sidebar.selectbox("시각화 테마 선택", PALETTE_NAMES,
+                                  index=DEFAULT_THEME_INDEX)
 
 # ---- YTD 계산 (없는 달은 0으로 채움) ----
-df_year = ensure_total_col(df[df["연"] == selected_year].copy())
-# 월별 합계를 1..12로 재인덱스 → 누락월 0
-monthly_total = (
-    df_year.groupby("월")["소계"].sum()
-    .reindex(range(1, 13), fill_value=0)
-)
-ytd = int(monthly_total.loc[1:selected_month].sum())
+ytd = int(data.ytd_cum.loc[(selected_year, selected_month), "소계"])
 
 # 전년 동월까지 누계 비교
-if (selected_year - 1) in df["연"].unique():
-    prev = ensure_total_col(df[df["연"] == selected_year - 1].copy())
-    prev_monthly_total = (
-        prev.groupby("월")["소계"].sum()
-        .reindex(range(1, 13), fill_value=0)
-    )
-    ytd_prev = int(prev_monthly_total.loc[1:selected_month].sum())
+if (selected_year - 1) in data.years_set:
+    ytd_prev = int(data.ytd_cum.loc[(selected_year - 1, selected_month), "소계"])
     delta_str = f"{ytd - ytd_prev:+,}"
 else:
     ytd_prev, delta_str = None, None
 
-st.sidebar.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+st.sidebar.divider()
 st.sidebar.subheader("연도 누계(YTD)")
 if delta_str is None:
     st.sidebar.metric(label=f"{selected_year}년 1~{selected_month}월", value=f"{ytd:,}")
 else:
     st.sidebar.metric(label=f"{selected_year}년 1~{selected_month}월", value=f"{ytd:,}", delta=delta_str)
 
-st.sidebar.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+st.sidebar.divider()
 st.sidebar.info("👉 월은 항상 1–12 선택 가능하며, 데이터가 없는 달은 0으로 계산됩니다.")
 
-# 선택 연월 데이터 (없으면 0행 생성)
-selected_ym = selected_year * 100 + selected_month
-row = df[(df["연"] == selected_year) & (df["월"] == selected_month)]
-if row.empty:
-    # 0으로 채운 가상 행(시각화/지표 유지용)
-    zero_data = {c: 0 for c in regions_all}
-    zero_data.update({"연월": selected_ym, "연": selected_year, "월": selected_month, "소계": 0})
-    df_selected = pd.DataFrame([zero_data])
-else:
-    df_selected = row.copy()
+# 선택 지역의 해당 연월 값 (없는 연월은 0)
+regions_key = tuple(selected_regions)
+row_vec = get_region_row(selected_year, selected_month, regions_key)
 
 # -----------------------------
 # Layout columns
@@ -147,41 +314,21 @@ col = st.columns([1.15, 1.2, 1.05], gap="medium")
 with col[0]:
     st.header("핵심 지표")
 
-    total_cases = int(df_selected["소계"].sum())
+    total_cases = int(data.monthly_by_region.loc[(selected_year, selected_month), "소계"])
     st.metric("전체 발생 건수", f"{total_cases:,}")
 
     if not selected_regions:
         st.warning("선택된 지역이 없습니다. 사이드바에서 지역을 선택하세요.")
     else:
-        region_sums = df_selected[selected_regions].sum().fillna(0)
-        region_max = region_sums.idxmax()
-        region_min = region_sums.idxmin()
-        st.metric("최다 발생 지역", f"{region_max} ({int(region_sums.max()):,})")
-        st.metric("최소 발생 지역", f"{region_min} ({int(region_sums.min()):,})")
+        i_max = int(row_vec.argmax())
+        i_min = int(row_vec.argmin())
+        st.metric("최다 발생 지역", f"{selected_regions[i_max]} ({int(row_vec[i_max]):,})")
+        st.metric("최소 발생 지역", f"{selected_regions[i_min]} ({int(row_vec[i_min]):,})")
 
-    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+    st.divider()
     st.subheader("월별 발생 추세")
 
-    # 같은 연도의 추세 (없는 달 0으로)
-    trend = (
-        ensure_total_col(df[df["연"] == selected_year])[["연월", "월", "소계"]]
-        .groupby("월")["소계"].sum()
-        .reindex(range(1, 13), fill_value=0)
-        .reset_index()
-        .rename(columns={"index": "월"})
-    )
-    trend["연월"] = selected_year * 100 + trend["월"]
-
-    fig_line = px.line(
-        trend, x="연월", y="소계", markers=True, template=palette["template"]
-    )
-    fig_line.update_traces(line=dict(width=3), marker=dict(size=7))
-    fig_line.update_layout(
-        yaxis_title="발생건수",
-        colorway=palette["seq"],
-        margin=dict(l=10, r=10, t=10, b=10),
-        height=330,
-    )
+    fig_line = build_trend_fig(*get_trend(selected_year), theme_name)
     st.plotly_chart(fig_line, use_container_width=True)
 
 # -----------------------------
@@ -190,56 +337,26 @@ with col[0]:
 with col[1]:
     st.header("지역별 발생 분포")
 
-    if not selected_regions:
-        st.info("지역을 하나 이상 선택하세요.")
-    else:
-        region_sums_df = (
-            df_selected[selected_regions]
-            .sum()
-            .fillna(0)
-            .reset_index()
-            .rename(columns={"index": "지역", 0: "발생건수"})
-        )
-        region_sums_df.columns = ["지역", "발생건수"]
-
-        fig_bar = px.bar(
-            region_sums_df.sort_values("발생건수", ascending=True),
-            x="발생건수", y="지역",
-            orientation="h",
-            template=palette["template"],
-            color="발생건수",
-            color_continuous_scale=palette["cont"],
-        )
-        fig_bar.update_layout(margin=dict(l=10, r=10, t=10, b=10), height=340)
-        st.plotly_chart(fig_bar, use_container_width=True)
-
-    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
-    st.subheader("연도별 지역 발생 히트맵")
-
-    if selected_regions:
-        df_year_full = ensure_total_col(df[df["연"] == selected_year].copy())
-        # 1~12월 모두 가지도록 보강
-        idx = pd.MultiIndex.from_product([range(1, 13), selected_regions], names=["월", "지역"])
-        melted = (
-            df_year_full.melt(id_vars=["연", "월"], value_vars=selected_regions,
-                              var_name="지역", value_name="발생건수")
-            .groupby(["월", "지역"])["발생건수"].sum()
-            .reindex(idx, fill_value=0)
-            .reset_index()
-        )
-        heatmap_data = melted.pivot(index="지역", columns="월", values="발생건수")
-
-        fig_heatmap = px.imshow(
-            heatmap_data,
-            aspect="auto",
-            color_continuous_scale=palette["cont"],
-            labels=dict(x="월", y="지역", color="발생건수"),
-            template=palette["template"],
-        )
-        fig_heatmap.update_layout(margin=dict(l=10, r=10, t=10, b=10), height=350)
-        st.plotly_chart(fig_heatmap, use_container_width=True)
-    else:
-        st.info("히트맵을 보려면 지역을 하나 이상 선택하세요.")
+    # 선택된 탭만 그림 (탭 전환 시 rerun)
+    tab_bar, tab_heatmap = st.tabs(["분포", "연도별 히트맵"], key="dist_tab", on_change="rerun")
+
+    with tab_bar:
+        if tab_bar.open:
+            if not selected_regions:
+                st.info("지역을 하나 이상 선택하세요.")
+            else:
+                fig_bar = build_region_bar(regions_key, row_vec, theme_name)
+                st.plotly_chart(fig_bar, use_container_width=True)
+
+    with tab_heatmap:
+        if tab_heatmap.open:
+            if selected_regions:
+                fig_heatmap = build_heatmap(
+                    regions_key, get_heatmap(selected_year, regions_key), theme_name
+                )
+                st.plotly_chart(fig_heatmap, use_container_width=True)
+            else:
+                st.info("히트맵을 보려면 지역을 하나 이상 선택하세요.")
 
 # -----------------------------
 # col[2]: Top5 랭킹 + 설명
@@ -247,28 +364,17 @@ with col[1]:
 with col[2]:
     st.header("Top 지역 랭킹")
 
-    if not selected_regions:
-        st.info("지역을 선택해 주세요.")
-    else:
-        region_sums = (
-            df_selected[selected_regions]
-            .sum()
-            .fillna(0)
-            .reset_index()
-        )
-        region_sums.columns = ["지역", "발생건수"]
-        top_regions = region_sums.sort_values("발생건수", ascending=False).head(5)
-
-        fig_top = px.bar(
-            top_regions, x="지역", y="발생건수",
-            template=palette["template"],
-            color="발생건수",
-            color_continuous_scale=palette["cont"],
-        )
-        fig_top.update_layout(margin=dict(l=10, r=10, t=10, b=10), height=340)
-        st.plotly_chart(fig_top, use_container_width=True)
-
-    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+    # 펼쳤을 때만 그림 (열고 닫을 때 rerun)
+    top_expander = st.expander("Top 5 지역 보기", expanded=False, key="top5_open", on_change="rerun")
+    with top_expander:
+        if top_expander.open:
+            if not selected_regions:
+                st.info("지역을 선택해 주세요.")
+            else:
+                fig_top = build_top5(regions_key, row_vec, theme_name)
+                st.plotly_chart(fig_top, use_container_width=True)
+
+    st.divider()
     st.subheader("데이터 설명")
     st.markdown(
         """